@@ -0,0 +1,34 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..'))
+
+# Source city table and the directory its read-only .npy snapshot is written to.
+# Every worker memory-maps the same snapshot, so the table lives in the page cache once.
+CSV_PATH = os.path.join(ROOT_DIR, 'pk_cities_cleanedAccApi_data.csv')
+CITY_CACHE_DIR = os.getenv("CITY_CACHE_DIR", os.path.join(BACKEND_DIR, '.cache', 'cities'))
+
+# Cross-worker cache for LLM and weather responses (a single SQLite file in WAL mode).
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(BACKEND_DIR, '.cache', 'shared_cache.sqlite3'))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "900"))          # seconds
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))  # seconds
+
+# Hazard surface interpolated from per-city observations (see services/hazard_grid.py)
+HAZARD_OBSERVATION_TTL = int(os.getenv("HAZARD_OBSERVATION_TTL", "21600"))  # seconds a city's values stay on the map
+# Requests snap to one of these cell sizes (degrees); each costs one neighbour index per worker
+HAZARD_GRID_RESOLUTIONS = tuple(float(r) for r in os.getenv("HAZARD_GRID_RESOLUTIONS", "0.25,0.1,0.05").split(","))
+HAZARD_GRID_RESOLUTION = float(os.getenv("HAZARD_GRID_RESOLUTION", "0.1"))  # default cell size in degrees
+HAZARD_GRID_NEIGHBOURS = int(os.getenv("HAZARD_GRID_NEIGHBOURS", "8"))      # cities blended per cell
+HAZARD_GRID_POWER = float(os.getenv("HAZARD_GRID_POWER", "2"))              # inverse-distance exponent
+HAZARD_GRID_MAX_DISTANCE_KM = float(os.getenv("HAZARD_GRID_MAX_DISTANCE_KM", "150"))  # cells further from any observed city are NODATA
+HAZARD_TILE_SIZE = int(os.getenv("HAZARD_TILE_SIZE", "64"))                 # cells per tile edge
+
+# Server settings
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+# How long a worker may keep finishing in-flight requests when it is restarted
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
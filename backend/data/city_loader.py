@@ -0,0 +1,136 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import CSV_PATH, CITY_CACHE_DIR
+
+EARTH_RADIUS_KM = 6371.0
+
+# Arrays written to disk; each one is memory-mapped read-only by every worker.
+_ARRAYS = ("names", "provinces", "coords", "unit_vectors")
+
+
+def _fingerprint(csv_path: str) -> str:
+    """Identifies a version of the CSV so a changed file triggers a rebuild."""
+    stat = os.stat(csv_path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def _array_path(cache_dir: str, fingerprint: str, name: str) -> str:
+    return os.path.join(cache_dir, f"{fingerprint}_{name}.npy")
+
+
+def to_unit_vectors(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Converts lat/lng in degrees to 3D unit vectors (n, 3)."""
+    lat_r = np.radians(lat)
+    lng_r = np.radians(lng)
+    cos_lat = np.cos(lat_r)
+    return np.stack([cos_lat * np.cos(lng_r), cos_lat * np.sin(lng_r), np.sin(lat_r)], axis=-1)
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Converts straight-line distance between unit vectors to great-circle km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def build_city_cache(csv_path: str = CSV_PATH, cache_dir: str = CITY_CACHE_DIR) -> str:
+    """
+    Writes the city table and its spatial index to .npy files and returns the fingerprint.
+    Call this once in the parent process before workers start; workers then only mmap.
+    Safe to run concurrently: every file is written to a temp name and atomically renamed.
+    """
+    fingerprint = _fingerprint(csv_path)
+    if all(os.path.exists(_array_path(cache_dir, fingerprint, name)) for name in _ARRAYS):
+        return fingerprint
+
+    print(f"   [CITY CACHE] Building shared city table from {csv_path}...")
+    df = pd.read_csv(csv_path)
+    lat = df['lat'].to_numpy(dtype=np.float64)
+    lng = df['lng'].to_numpy(dtype=np.float64)
+
+    arrays = {
+        "names": df['city'].astype(str).to_numpy(dtype=str),
+        "provinces": df['admin_name'].fillna("").astype(str).to_numpy(dtype=str),
+        "coords": np.column_stack([lat, lng, df['population'].to_numpy(dtype=np.float64)]),
+        "unit_vectors": to_unit_vectors(lat, lng),
+    }
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, array in arrays.items():
+        final_path = _array_path(cache_dir, fingerprint, name)
+        tmp_path = f"{final_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, final_path)
+
+    # Older snapshots belong to a previous CSV; workers still mapping them keep
+    # their pages until they exit, so unlinking here is safe.
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".npy") and not filename.startswith(f"{fingerprint}_"):
+            os.remove(os.path.join(cache_dir, filename))
+
+    return fingerprint
+
+
+class CityTable:
+    """Read-only view over the memory-mapped city arrays."""
+
+    def __init__(self, cache_dir: str, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.names = np.load(_array_path(cache_dir, fingerprint, "names"), mmap_mode="r")
+        self.provinces = np.load(_array_path(cache_dir, fingerprint, "provinces"), mmap_mode="r")
+        self.coords = np.load(_array_path(cache_dir, fingerprint, "coords"), mmap_mode="r")
+        self.unit_vectors = np.load(_array_path(cache_dir, fingerprint, "unit_vectors"), mmap_mode="r")
+        # The name index is tiny (one entry per city), so each worker keeps its own
+        self._index = {str(name).lower(): i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, city: str) -> Optional[int]:
+        return self._index.get(city.strip().lower())
+
+    def baseline(self, city: str) -> Dict[str, Any]:
+        """Returns the baseline dict used in GraphState, or {} for an unknown city."""
+        i = self.find(city)
+        if i is None:
+            return {}
+        lat, lng, population = self.coords[i]
+        return {
+            "lat": float(lat),
+            "lng": float(lng),
+            "population": float(population),
+            "province": str(self.provinces[i])
+        }
+
+    def distances_from(self, i: int) -> np.ndarray:
+        """Great-circle distance (km) from city i to every city, in one vectorized pass."""
+        chord = np.linalg.norm(self.unit_vectors - self.unit_vectors[i], axis=1)
+        return chord_to_km(chord)
+
+    def nearest(self, city: str, min_km: float = 50.0, k: int = 3) -> List[Dict[str, Any]]:
+        """Closest k cities that are more than min_km away from the given city."""
+        i = self.find(city)
+        if i is None:
+            return []
+        dist = self.distances_from(i)
+        candidates = np.flatnonzero(dist > min_km)
+        order = candidates[np.argsort(dist[candidates], kind="stable")[:k]]
+        return [
+            {"city": str(self.names[j]), "distance": float(dist[j]), "population": float(self.coords[j, 2])}
+            for j in order
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_city_table(csv_path: str = CSV_PATH, cache_dir: str = CITY_CACHE_DIR) -> CityTable:
+    """
+    Returns this process's view of the shared city table, resolved once on first use.
+    The supervisor builds the cache at startup; a worker only builds it if it is missing
+    (e.g. run without main.py). A changed CSV is picked up by a restart, not mid-request.
+    """
+    fingerprint = build_city_cache(csv_path, cache_dir)
+    return CityTable(cache_dir, fingerprint)
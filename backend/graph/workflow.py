@@ -1,7 +1,6 @@
 import sys
 import os
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 load_dotenv()
@@ -16,6 +15,16 @@ from smolagents import LiteLLMModel, ToolCallingAgent
 from typing import TypedDict, List, Dict, Any
 from langgraph.graph import StateGraph, END
 from graph.tools import find_nearest_safe_cities
+from config import LLM_CACHE_TTL
+from data.city_loader import get_city_table
+from services.cache import shared_cache, make_key
+from services.weather import get_forecast
+
+# ==========================================
+# 🚨 HACKATHON DEMO MODE TOGGLE 🚨
+# Module-level so main.py can keep dummy weather out of the hazard map
+DEMO_MODE = True 
+# ==========================================
 
 token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 ai_model = LiteLLMModel(
@@ -23,6 +32,20 @@ ai_model = LiteLLMModel(
     api_key=token
 )
 
+
+def ask_llm(messages: List[Dict[str, Any]]) -> str:
+    """Calls the model, sharing identical prompts' answers across all workers."""
+    key = make_key(ai_model.model_id, messages)
+    cached = shared_cache.get("llm", key)
+    if cached is not None:
+        return cached
+
+    ai_response = ai_model(messages)
+    text = ai_response.content.strip()
+    shared_cache.set("llm", key, text, LLM_CACHE_TTL)
+    return text
+
+
 class GraphState(TypedDict):
     city: str
     profession: str
@@ -51,25 +74,9 @@ def fetch_data_node(state: GraphState) -> Dict[str, Any]:
     # --- 1. Fetch CSV Baseline (We always want real population data) ---
     city_baseline = {}
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.abspath(os.path.join(current_dir, '..', '..', 'pk_cities_cleanedAccApi_data.csv'))
-        df = pd.read_csv(csv_path)
-        city_row = df[df['city'].str.lower() == city.lower()]
-        
-        if not city_row.empty:
-            city_baseline = {
-                "lat": city_row.iloc[0]['lat'],
-                "lng": city_row.iloc[0]['lng'],
-                "population": city_row.iloc[0]['population'],
-                "province": city_row.iloc[0]['admin_name']
-            }
+        city_baseline = get_city_table().baseline(city)
     except Exception as e:
-        print(f"   [ERROR] Could not load CSV: {e}")
-
-    # ==========================================
-    # 🚨 HACKATHON DEMO MODE TOGGLE 🚨
-    DEMO_MODE = True 
-    # ==========================================
+        print(f"   [ERROR] Could not load city table: {e}")
 
     if DEMO_MODE:
         print(f"   [DEMO MODE ACTIVE] Injecting extreme dummy data for {concern}...")
@@ -97,13 +104,7 @@ def fetch_data_node(state: GraphState) -> Dict[str, Any]:
     live_weather, forecast_weather, historical_weather = {}, [], []
     
     try:
-        url_forecast = f"http://api.weatherapi.com/v1/forecast.json?key={API_KEY}&q={city}&days=3&aqi=yes"
-        resp = requests.get(url_forecast, timeout=5)
-        
-        if resp.status_code != 200:
-            raise Exception("API Request Failed")
-            
-        resp_f = resp.json()
+        resp_f = get_forecast(city, API_KEY)
         
         live_weather = {
             "temp": resp_f["current"]["temp_c"],
@@ -156,8 +157,7 @@ def flood_agent_node(state: GraphState) -> Dict[str, Any]:
     """
 
     messages = [{"role": "user", "content": prompt}]
-    ai_response = ai_model(messages)
-    decision = ai_response.content.strip()
+    decision = ask_llm(messages)
 
     print(f" AI Decision: Flood Risk is {decision}")
     return {"risk_assessments": {**state.get("risk_assessments", {}), "Flood": decision}}
@@ -181,8 +181,7 @@ def drought_agent_node(state: GraphState) -> Dict[str, Any]:
     """
     
     messages = [{"role": "user", "content": prompt}]
-    ai_response = ai_model(messages)
-    decision = ai_response.content.strip()
+    decision = ask_llm(messages)
     
     print(f" AI Decision: Drought Risk is {decision}")
     return {"risk_assessments": {**state.get("risk_assessments", {}), "Drought": decision}}
@@ -205,8 +204,7 @@ def aqi_agent_node(state: GraphState) -> Dict[str, Any]:
     """
     
     messages = [{"role": "user", "content": prompt}]
-    ai_response = ai_model(messages)
-    decision = ai_response.content.strip()
+    decision = ask_llm(messages)
     
     print(f" AI Decision: AQI Risk is {decision}")
     return {"risk_assessments": {**state.get("risk_assessments", {}), "AQI": decision}}
@@ -227,9 +225,7 @@ def heatwave_agent_node(state: GraphState) -> Dict[str, Any]:
     
     messages = [{"role": "user", "content": prompt}]
 
-    ai_response = ai_model(messages)
-    
-    decision = ai_response.content.strip()
+    decision = ask_llm(messages)
     
     print(f"AI Decision: Heatwave Risk is {decision}")
     
@@ -295,8 +291,7 @@ def personalization_node(state: GraphState) -> Dict[str, Any]:
     messages = [{"role": "user", "content": prompt}]
     
 
-    ai_response = ai_model(messages)
-    advice_text = ai_response.content.strip()
+    advice_text = ask_llm(messages)
     
     advice_list = [line.strip() for line in advice_text.split('\n') if line.strip()]
     
@@ -318,8 +313,7 @@ def survival_kit_node(state: GraphState) -> Dict[str, Any]:
     
     messages = [{"role": "user", "content": prompt}]
     
-    ai_response = ai_model(messages)
-    kit_text = ai_response.content.strip()
+    kit_text = ask_llm(messages)
     
     kit_list = [line.strip() for line in kit_text.split('\n') if line.strip()]
     
@@ -367,8 +361,7 @@ def ngo_dispatch_node(state: GraphState) -> Dict[str, Any]:
     """
     
     messages = [{"role": "user", "content": prompt}]
-    ai_response = ai_model(messages)
-    dispatch_text = ai_response.content.strip()
+    dispatch_text = ask_llm(messages)
     
     print(" Official Dispatch & Logistics Calculated")
     
@@ -1,12 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import os
+from typing import Optional
 import uvicorn
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-from graph.workflow import app as langgraph_app
+from config import HOST, PORT, WORKERS, GRACEFUL_SHUTDOWN_TIMEOUT, HAZARD_GRID_RESOLUTION
+from data.city_loader import build_city_cache, get_city_table
+from graph.workflow import app as langgraph_app, DEMO_MODE
+from services.cache import shared_cache
+from services.hazard_grid import record_observation, grid_metadata, validate_tile, encode_tile, current_snapshot
+
+# Map the shared city table while the worker boots, so no request pays for it
+get_city_table()
 
 app = FastAPI()
 
@@ -26,6 +35,11 @@ async def root_endpoint():
     print("⚠️ Something just hit the root endpoint!")
     return {"message": "Climate Risk API is Live! Please send requests to /api/analyze-risk"}
 
+@app.get("/api/health")
+async def health():
+    # Used by the load balancer to know when a restarted worker is ready again
+    return {"status": "ok", "pid": os.getpid(), "city_data": get_city_table().fingerprint}
+
 class RiskRequest(BaseModel):
     city: str
     profession: str
@@ -56,10 +70,48 @@ async def analyze_risk(request: RiskRequest):
     }
     
     final_state = langgraph_app.invoke(initial_state)
+
+    # Feed this city's values into the map's hazard surface (demo weather is fake, so keep it off the map)
+    if not DEMO_MODE:
+        try:
+            record_observation(request.city, request.concern, final_state.get("live_weather", {}), final_state.get("overall_severity", "Low"))
+        except Exception as e:
+            print(f"   [HAZARD GRID ERROR] {e}")
     
     # Return the data to React (FastAPI handles the JSON conversion automatically, just like JsonResponse in Django)
     return final_state
 
+@app.get("/api/hazard-grid/{layer}")
+def hazard_grid(layer: str, resolution: float = HAZARD_GRID_RESOLUTION):
+    # Grid geometry and tile layout for a layer. Plain def (like the tile route) so FastAPI
+    # runs it in the threadpool instead of blocking the event loop.
+    try:
+        return grid_metadata(layer, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/hazard-grid/{layer}/{tile_row}/{tile_col}")
+def hazard_grid_tile(layer: str, tile_row: int, tile_col: int, resolution: float = HAZARD_GRID_RESOLUTION,
+                     if_none_match: Optional[str] = Header(None)):
+    # Tiles only change with the snapshot, so clients revalidate (no-cache) and usually get a 304
+    cache_headers = {"Cache-Control": "no-cache"}
+    snapshot = current_snapshot()
+    etag = f'"{snapshot[0]}"'
+
+    try:
+        n_observed = validate_tile(layer, resolution, tile_row, tile_col, snapshot)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not n_observed:
+        raise HTTPException(status_code=404, detail="No city observations yet for this layer")
+
+    if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={**cache_headers, "ETag": etag})
+
+    _, tile = encode_tile(layer, resolution, tile_row, tile_col, snapshot)
+    return Response(content=tile, media_type="application/octet-stream", headers={**cache_headers, "ETag": etag})
+
 @app.post("/api/send-alert")
 async def send_alert(request: AlertRequest):
     print(f"📧 Preparing to send alert to: {request.recipient_email}")
@@ -119,4 +171,14 @@ async def send_alert(request: AlertRequest):
         return {"status": "success", "message": f"[DEMO] Alert successfully emailed to {request.recipient_email}."}
     
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Build the shared city snapshot once, before any worker exists;
+    # every worker then memory-maps the same files instead of loading its own copy.
+    build_city_cache()
+    shared_cache.purge_expired()
+
+    if WORKERS > 1:
+        # Multi-worker mode: uvicorn needs an import string so each worker can load the app.
+        # Send SIGHUP to this supervisor process for a rolling restart (workers are replaced one at a time).
+        uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS, timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT)
+    else:
+        uvicorn.run(app, host=HOST, port=PORT, timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import SHARED_CACHE_PATH
+
+# Expired rows are skipped on read; every this many writes a process also deletes them,
+# so free-text keys (profession, concern) can't grow the file without bound.
+_PURGE_EVERY = 500
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of any JSON-serialisable parts (prompts, city names, model ids...)."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SharedCache:
+    """
+    Key/value cache shared by every worker on the host, backed by one SQLite file.
+    WAL mode lets many readers run alongside a single writer, which is all a
+    read-heavy response cache needs. Values must be JSON-serialisable.
+    """
+
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork, so each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"   [CACHE ERROR] {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        try:
+            with self._lock:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, default=str), time.time() + ttl)
+                )
+        except sqlite3.Error as e:
+            # A cache write failing must never fail the request
+            print(f"   [CACHE ERROR] {e}")
+            return
+
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        """All live entries in a namespace."""
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT key, value FROM cache WHERE namespace = ? AND expires_at > ?",
+                    (namespace, time.time())
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"   [CACHE ERROR] {e}")
+            return {}
+        return {key: json.loads(value) for key, value in rows}
+
+    def purge_expired(self) -> None:
+        try:
+            with self._lock:
+                self._connection().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"   [CACHE ERROR] {e}")
+
+
+shared_cache = SharedCache()
@@ -0,0 +1,290 @@
+import base64
+import math
+import struct
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    HAZARD_OBSERVATION_TTL, HAZARD_GRID_RESOLUTIONS, HAZARD_GRID_NEIGHBOURS, HAZARD_GRID_POWER,
+    HAZARD_GRID_MAX_DISTANCE_KM, HAZARD_TILE_SIZE
+)
+from data.city_loader import get_city_table, to_unit_vectors, chord_to_km
+from services.cache import shared_cache, make_key
+
+# lat_min, lat_max, lng_min, lng_max covering all of Pakistan
+PAKISTAN_BOUNDS = (23.5, 37.2, 60.8, 77.9)
+
+RISK_LEVELS = {"low": 0.0, "medium": 1.0, "high": 2.0}
+
+# Concerns with their own hazard agent; a flood severity and a heatwave severity
+# mean different things, so each gets its own risk layer.
+CONCERNS = ("flood", "drought", "heatwave", "aqi")
+
+# Per-layer uint16 quantisation: value = raw * scale + offset. Fixed per layer so
+# the map team can reuse one colour ramp across snapshots.
+LAYERS = {
+    "temp": {"scale": 0.01, "offset": -50.0},   # °C, -50 .. 605
+    "aqi": {"scale": 0.1, "offset": 0.0},       # PM2.5, 0 .. 6553
+    **{f"risk-{concern}": {"scale": 0.001, "offset": 0.0} for concern in CONCERNS},  # 0 = Low, 1 = Medium, 2 = High
+}
+NODATA = 65535
+
+# magic, height, width, tile_row, tile_col, north, west, resolution, scale, offset
+TILE_HEADER = struct.Struct("<4sHHHHfffff")
+TILE_MAGIC = b"HZT1"
+
+# Cells are processed in chunks so fine resolutions don't allocate (cells x cities) at once
+_CHUNK_CELLS = 16384
+
+# Latest decoded raster per "layer:resolution" in this worker: (snapshot id, raster)
+_decoded_rasters: Dict[str, Tuple[str, np.ndarray]] = {}
+
+
+def record_observation(city: str, concern: str, live_weather: Dict[str, Any], severity: str) -> None:
+    """
+    Stores one analysis result the grid is interpolated from (shared by all workers).
+    Observations are keyed by concern and city, since the severity only describes that hazard.
+    """
+    table = get_city_table()
+    concern = concern.strip().lower()
+    if table.find(city) is None or concern not in CONCERNS:
+        return
+
+    observation = {
+        "city": city.strip().lower(),
+        "concern": concern,
+        "temp": live_weather.get("temp"),
+        "aqi": live_weather.get("aqi"),
+        "risk": RISK_LEVELS.get(str(severity).lower()),
+        "observed_at": time.time()
+    }
+    shared_cache.set("observations", f"{concern}:{observation['city']}", observation, HAZARD_OBSERVATION_TTL)
+
+
+def _layer_values(layer: str, observations: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Per-city values for one layer. Weather layers use each city's most recent
+    observation under any concern; risk layers only use that concern's observations.
+    """
+    if layer.startswith("risk-"):
+        concern = layer[len("risk-"):]
+        return {
+            obs["city"]: float(obs["risk"]) for obs in observations.values()
+            if obs["concern"] == concern and obs.get("risk") is not None
+        }
+
+    values = {}
+    for obs in sorted(observations.values(), key=lambda o: o["observed_at"]):
+        if obs.get(layer) is not None:
+            values[obs["city"]] = float(obs[layer])
+    return values
+
+
+def current_snapshot() -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """Returns (snapshot id, observations). The id changes whenever any city's values change."""
+    observations = shared_cache.items("observations")
+    return make_key(sorted(observations.items()))[:16], observations
+
+
+def normalise_resolution(resolution: float) -> float:
+    """
+    Snaps a requested cell size to the nearest supported one. Each supported size has
+    one neighbour index per worker, so only a small fixed set is allowed.
+    """
+    return min(HAZARD_GRID_RESOLUTIONS, key=lambda r: abs(r - resolution))
+
+
+def grid_shape(resolution: float) -> Tuple[int, int]:
+    lat_min, lat_max, lng_min, lng_max = PAKISTAN_BOUNDS
+    # Rounding first stops float error (13.7 / 0.1 = 137.00000000000003) adding a phantom row
+    return math.ceil(round((lat_max - lat_min) / resolution, 6)), math.ceil(round((lng_max - lng_min) / resolution, 6))
+
+
+def grid_bounds(resolution: float) -> Dict[str, float]:
+    """
+    True extent of the raster. grid_shape rounds up, so the south and east edges
+    can reach past PAKISTAN_BOUNDS; clients must place the raster using these.
+    """
+    _, lat_max, lng_min, _ = PAKISTAN_BOUNDS
+    n_rows, n_cols = grid_shape(resolution)
+    return {
+        "south": round(lat_max - n_rows * resolution, 6),
+        "north": lat_max,
+        "west": lng_min,
+        "east": round(lng_min + n_cols * resolution, 6)
+    }
+
+
+def _cell_centres(resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Lat/lng of every cell centre, row-major from the north-west corner."""
+    lat_min, lat_max, lng_min, lng_max = PAKISTAN_BOUNDS
+    n_rows, n_cols = grid_shape(resolution)
+    lats = lat_max - (np.arange(n_rows) + 0.5) * resolution
+    lngs = lng_min + (np.arange(n_cols) + 0.5) * resolution
+    lat_grid, lng_grid = np.meshgrid(lats, lngs, indexing="ij")
+    return lat_grid.ravel(), lng_grid.ravel()
+
+
+@lru_cache(maxsize=4)
+def _neighbour_index(fingerprint: str, resolution: float, rows: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every grid cell, its k nearest observed cities (indices into `rows`) and the
+    distance to each (km). Only depends on which cities are observed, not their values,
+    so the few live layers at a supported resolution share a handful of cached indices.
+    """
+    table = get_city_table()
+    city_vectors = np.asarray(table.unit_vectors)[list(rows)]
+    k = min(HAZARD_GRID_NEIGHBOURS, len(rows))
+
+    lat, lng = _cell_centres(resolution)
+    cell_vectors = to_unit_vectors(lat, lng)
+
+    idx = np.empty((len(cell_vectors), k), dtype=np.int16)
+    dist = np.empty((len(cell_vectors), k), dtype=np.float32)
+    for start in range(0, len(cell_vectors), _CHUNK_CELLS):
+        chunk = cell_vectors[start:start + _CHUNK_CELLS]
+        # For unit vectors the largest dot product is the nearest city, so rank on that
+        # and only measure exact distances to the k winners
+        nearest = np.argpartition(-(chunk @ city_vectors.T), k - 1, axis=1)[:, :k]
+        idx[start:start + len(chunk)] = nearest
+        dist[start:start + len(chunk)] = chord_to_km(np.linalg.norm(city_vectors[nearest] - chunk[:, None, :], axis=2))
+
+    return idx, dist
+
+
+def _build_surface(layer: str, resolution: float, values: Tuple[Optional[float], ...]) -> np.ndarray:
+    """
+    Quantised uint16 raster for one layer; `values` has one entry per city row, None if
+    unobserved. Each cell blends its k nearest observed cities by inverse distance,
+    ignoring any beyond HAZARD_GRID_MAX_DISTANCE_KM; cells with none in range are NODATA.
+    """
+    rows = tuple(row for row, value in enumerate(values) if value is not None)
+    idx, dist = _neighbour_index(get_city_table().fingerprint, resolution, rows)
+    observed_values = np.array([values[row] for row in rows], dtype=np.float64)
+
+    in_range = dist <= HAZARD_GRID_MAX_DISTANCE_KM
+    # Clamp so a cell centred on a city takes (almost) exactly that city's value
+    weights = np.where(in_range, 1.0 / np.maximum(dist, 0.1) ** HAZARD_GRID_POWER, 0.0)
+    total = weights.sum(axis=1)
+    surface = (weights * observed_values[idx]).sum(axis=1) / np.where(total > 0, total, 1.0)
+
+    params = LAYERS[layer]
+    quantised = np.round((surface - params["offset"]) / params["scale"])
+    quantised = np.clip(quantised, 0, NODATA - 1).astype("<u2")
+    quantised[total == 0] = NODATA
+    return quantised.reshape(grid_shape(resolution))
+
+
+Snapshot = Tuple[str, Dict[str, Dict[str, Any]]]
+
+
+def _observed_values(layer: str, snapshot: Optional[Snapshot] = None) -> Tuple[str, Tuple[Optional[float], ...], int]:
+    """
+    Returns (snapshot id, one value per city row or None, number of observed cities).
+    Pass a snapshot from current_snapshot() to avoid re-reading the observations.
+    """
+    if layer not in LAYERS:
+        raise ValueError(f"Unknown layer '{layer}'. Choose one of: {', '.join(LAYERS)}")
+
+    snapshot_id, observations = snapshot or current_snapshot()
+    table = get_city_table()
+
+    values: List[Optional[float]] = [None] * len(table)
+    for city, value in _layer_values(layer, observations).items():
+        row = table.find(city)
+        if row is not None:
+            values[row] = value
+
+    n_observed = sum(v is not None for v in values)
+    return snapshot_id, tuple(values), n_observed
+
+
+def get_surface(layer: str, resolution: float, snapshot: Optional[Snapshot] = None) -> Tuple[str, Optional[np.ndarray]]:
+    """
+    Returns (snapshot id, quantised raster or None if the layer has no observations).
+    The shared cache holds only the latest raster per layer and resolution, tagged with
+    its snapshot id, so whichever worker builds it first serves the others and a new
+    snapshot overwrites the old one. Each worker also keeps the latest decoded raster,
+    so tile requests don't re-read and decode it from SQLite.
+    """
+    snapshot_id, values, n_observed = _observed_values(layer, snapshot)
+    if not n_observed:
+        return snapshot_id, None
+
+    resolution = normalise_resolution(resolution)
+    cache_key = f"{layer}:{resolution}"
+    decoded = _decoded_rasters.get(cache_key)
+    if decoded is not None and decoded[0] == snapshot_id:
+        return snapshot_id, decoded[1]
+
+    cached = shared_cache.get("hazard_rasters", cache_key)
+    if cached is not None and cached["snapshot"] == snapshot_id:
+        surface = np.frombuffer(base64.b64decode(cached["raster"]), dtype="<u2").reshape(grid_shape(resolution))
+    else:
+        surface = _build_surface(layer, resolution, values)
+        raster = {"snapshot": snapshot_id, "raster": base64.b64encode(surface.tobytes()).decode("ascii")}
+        shared_cache.set("hazard_rasters", cache_key, raster, HAZARD_OBSERVATION_TTL)
+
+    _decoded_rasters[cache_key] = (snapshot_id, surface)
+    return snapshot_id, surface
+
+
+def grid_metadata(layer: str, resolution: float) -> Dict[str, Any]:
+    snapshot_id, _, n_cities = _observed_values(layer)
+    resolution = normalise_resolution(resolution)
+    n_rows, n_cols = grid_shape(resolution)
+    return {
+        "layer": layer,
+        "snapshot": snapshot_id,
+        "observed_cities": n_cities,
+        "bounds": grid_bounds(resolution),
+        "resolution": resolution,
+        "resolutions": list(HAZARD_GRID_RESOLUTIONS),
+        "rows": n_rows,
+        "cols": n_cols,
+        "tile_size": HAZARD_TILE_SIZE,
+        "tiles_y": math.ceil(n_rows / HAZARD_TILE_SIZE),
+        "tiles_x": math.ceil(n_cols / HAZARD_TILE_SIZE),
+        "scale": LAYERS[layer]["scale"],
+        "offset": LAYERS[layer]["offset"],
+        "nodata": NODATA,
+        "available": n_cities > 0
+    }
+
+
+def validate_tile(layer: str, resolution: float, tile_row: int, tile_col: int, snapshot: Optional[Snapshot] = None) -> int:
+    """
+    Raises ValueError for an unknown layer or a tile outside the grid; otherwise returns
+    the number of observed cities for the layer (0 means there is no tile to serve).
+    """
+    _, _, n_observed = _observed_values(layer, snapshot)
+    n_rows, n_cols = grid_shape(normalise_resolution(resolution))
+    top, left = tile_row * HAZARD_TILE_SIZE, tile_col * HAZARD_TILE_SIZE
+    if tile_row < 0 or tile_col < 0 or top >= n_rows or left >= n_cols:
+        raise ValueError(f"Tile ({tile_row}, {tile_col}) is outside the grid")
+    return n_observed
+
+
+def encode_tile(layer: str, resolution: float, tile_row: int, tile_col: int, snapshot: Optional[Snapshot] = None) -> Tuple[str, Optional[bytes]]:
+    """
+    Returns (snapshot id, tile bytes). A tile is TILE_HEADER followed by height*width
+    little-endian uint16 values, row-major from the tile's north-west corner.
+    """
+    resolution = normalise_resolution(resolution)
+    validate_tile(layer, resolution, tile_row, tile_col, snapshot)
+    snapshot_id, surface = get_surface(layer, resolution, snapshot)
+    if surface is None:
+        return snapshot_id, None
+
+    top, left = tile_row * HAZARD_TILE_SIZE, tile_col * HAZARD_TILE_SIZE
+    tile = surface[top:top + HAZARD_TILE_SIZE, left:left + HAZARD_TILE_SIZE]
+    params = LAYERS[layer]
+    header = TILE_HEADER.pack(
+        TILE_MAGIC, tile.shape[0], tile.shape[1], tile_row, tile_col,
+        PAKISTAN_BOUNDS[1] - top * resolution, PAKISTAN_BOUNDS[2] + left * resolution,
+        resolution, params["scale"], params["offset"]
+    )
+    return snapshot_id, header + np.ascontiguousarray(tile).tobytes()
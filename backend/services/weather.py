@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+import requests
+
+from config import WEATHER_CACHE_TTL
+from services.cache import shared_cache
+
+
+def get_forecast(city: str, api_key: str, days: int = 3) -> Dict[str, Any]:
+    """
+    Returns the raw WeatherAPI forecast JSON for a city.
+    Responses are shared between workers, so a city is fetched once per WEATHER_CACHE_TTL
+    no matter which worker the request lands on.
+    """
+    key = city.strip().lower()
+    cache_key = f"{key}:{days}"
+    cached = shared_cache.get("weather", cache_key)
+    if cached is not None:
+        print(f"   [WEATHER CACHE HIT] {city}")
+        return cached
+
+    url_forecast = f"http://api.weatherapi.com/v1/forecast.json?key={api_key}&q={city}&days={days}&aqi=yes"
+    resp = requests.get(url_forecast, timeout=5)
+
+    if resp.status_code != 200:
+        raise Exception("API Request Failed")
+
+    data = resp.json()
+    shared_cache.set("weather", cache_key, data, WEATHER_CACHE_TTL)
+    return data
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests import backend modules the same way main.py does, with backend/ on the path
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# config reads these at import time, so point them at a scratch dir before anything imports it
+_scratch = tempfile.mkdtemp(prefix="climate-risk-tests-")
+os.environ.setdefault("CITY_CACHE_DIR", os.path.join(_scratch, "cities"))
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(_scratch, "shared_cache.sqlite3"))
+
+
+@pytest.fixture
+def hazard_grid(tmp_path, monkeypatch):
+    """The hazard_grid module with an empty shared cache and no decoded rasters."""
+    from services import hazard_grid
+    from services.cache import SharedCache
+
+    monkeypatch.setattr(hazard_grid, "shared_cache", SharedCache(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(hazard_grid, "_decoded_rasters", {})
+    return hazard_grid
@@ -0,0 +1,94 @@
+import math
+
+import pytest
+
+from data.city_loader import get_city_table, EARTH_RADIUS_KM
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2)**2
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def cell_of(lat, lng, resolution, hg):
+    north, west = hg.PAKISTAN_BOUNDS[1], hg.PAKISTAN_BOUNDS[2]
+    row, col = int((north - lat) // resolution), int((lng - west) // resolution)
+    return row, col, north - (row + 0.5) * resolution, west + (col + 0.5) * resolution
+
+
+def observed(values_by_city):
+    table = get_city_table()
+    values = [None] * len(table)
+    for city, value in values_by_city.items():
+        values[table.find(city)] = value
+    return tuple(values)
+
+
+def test_grid_shape_ignores_float_error(hazard_grid):
+    assert hazard_grid.grid_shape(0.1) == (137, 171)
+    assert hazard_grid.grid_shape(0.25) == (55, 69)
+
+
+def test_resolution_snaps_to_supported_sizes(hazard_grid):
+    assert hazard_grid.normalise_resolution(0.001) == 0.05
+    assert hazard_grid.normalise_resolution(0.12) == 0.1
+    assert hazard_grid.normalise_resolution(5) == 0.25
+
+
+def test_bounds_cover_rounded_up_grid(hazard_grid):
+    assert hazard_grid.grid_bounds(0.25) == {"south": 23.45, "north": 37.2, "west": 60.8, "east": 78.05}
+
+
+def test_surface_matches_hand_computed_idw(hazard_grid):
+    table = get_city_table()
+    lahore, gujranwala = table.baseline("Lahore"), table.baseline("Gujranwala")
+    surface = hazard_grid._build_surface("temp", 0.1, observed({"Lahore": 30.0, "Gujranwala": 40.0}))
+
+    for city in (lahore, gujranwala):
+        row, col, lat, lng = cell_of(city["lat"] + 0.2, city["lng"] - 0.3, 0.1, hazard_grid)
+        d1 = haversine(lat, lng, lahore["lat"], lahore["lng"])
+        d2 = haversine(lat, lng, gujranwala["lat"], gujranwala["lng"])
+        expected = (30.0 / d1**2 + 40.0 / d2**2) / (1 / d1**2 + 1 / d2**2)
+        assert surface[row, col] * 0.01 - 50 == pytest.approx(expected, abs=0.01)
+
+
+def test_cells_beyond_cutoff_are_nodata(hazard_grid):
+    table = get_city_table()
+    karachi = table.baseline("Karachi")
+    surface = hazard_grid._build_surface("temp", 0.1, observed({"Lahore": 30.0}))
+
+    row, col, _, _ = cell_of(karachi["lat"], karachi["lng"], 0.1, hazard_grid)
+    assert surface[row, col] == hazard_grid.NODATA
+
+
+def test_quantisation_clips_below_offset_without_hitting_nodata(hazard_grid):
+    lahore = get_city_table().baseline("Lahore")
+    surface = hazard_grid._build_surface("temp", 0.1, observed({"Lahore": -80.0}))
+
+    row, col, _, _ = cell_of(lahore["lat"], lahore["lng"], 0.1, hazard_grid)
+    assert surface[row, col] == 0
+
+
+def test_tile_header_and_length(hazard_grid):
+    hazard_grid.record_observation("Lahore", "heatwave", {"temp": 41.5, "aqi": 180}, "High")
+
+    snapshot_id, tile = hazard_grid.encode_tile("temp", 0.1, 2, 2)
+    header = hazard_grid.TILE_HEADER.unpack(tile[:hazard_grid.TILE_HEADER.size])
+
+    # 137 x 171 grid: the last tile holds rows 128..136 and cols 128..170
+    magic, height, width, tile_row, tile_col, north, west, resolution, scale, offset = header
+    assert (magic, height, width, tile_row, tile_col) == (hazard_grid.TILE_MAGIC, 9, 43, 2, 2)
+    assert (north, west, resolution) == pytest.approx((37.2 - 12.8, 60.8 + 12.8, 0.1))
+    assert (scale, offset) == pytest.approx((0.01, -50.0))
+    assert len(tile) == hazard_grid.TILE_HEADER.size + 9 * 43 * 2
+    assert snapshot_id == hazard_grid.current_snapshot()[0]
+
+
+def test_validate_tile_rejects_bad_requests(hazard_grid):
+    assert hazard_grid.validate_tile("temp", 0.1, 0, 0) == 0
+    with pytest.raises(ValueError):
+        hazard_grid.validate_tile("wind", 0.1, 0, 0)
+    with pytest.raises(ValueError):
+        hazard_grid.validate_tile("temp", 0.1, 3, 0)